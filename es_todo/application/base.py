@@ -1,12 +1,91 @@
-from uuid import UUID, uuid5, uuid4
-
-from eventsourcing.application.simple import SimpleApplication
+import logging
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from uuid import UUID
+
+from pyrsistent import PVector, pvector
+from sqlalchemy import asc, bindparam, create_engine, event as sqlalchemy_event, select, tuple_
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.sql.schema import Column
+from sqlalchemy.sql.sqltypes import BigInteger, Integer, Text
+from sqlalchemy_utils.types.uuid import UUIDType
+
+from eventsourcing.application.simple import SnapshottingApplication
 from eventsourcing.domain.model.aggregate import AggregateRoot
-from eventsourcing.domain.model.collection import Collection, register_new_collection
 from eventsourcing.domain.model.events import subscribe, unsubscribe
+from eventsourcing.infrastructure.eventsourcedrepository import EventSourcedRepository
+from eventsourcing.infrastructure.eventstore import EventStore
+from eventsourcing.infrastructure.sequenceditem import StoredEvent
+from eventsourcing.infrastructure.sequenceditemmapper import SequencedItemMapper, reconstruct_object
+from eventsourcing.infrastructure.sqlalchemy.factory import SQLAlchemyInfrastructureFactory
+from eventsourcing.infrastructure.sqlalchemy.manager import SQLAlchemyRecordManager
+from eventsourcing.infrastructure.sqlalchemy.records import Base, StoredEventRecord
+from eventsourcing.utils.topic import get_topic, resolve_topic
+from eventsourcing.utils.transcoding import ObjectJSONDecoder, ObjectJSONEncoder, json_dumps, json_loads
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Snapshot aggregates every so many events, so hydration replays at
+# most this many events on top of the latest snapshot. Tunable per
+# deployment with the SNAPSHOT_PERIOD environment variable, or per
+# app with the 'period' constructor argument.
+SNAPSHOT_PERIOD = int(os.getenv('SNAPSHOT_PERIOD', '10'))
+
+SQLITE_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA cache_size=-64000',
+    'PRAGMA mmap_size=30000000000',
+    'PRAGMA busy_timeout=5000',
+)
+
+
+# Serializes writers. In-memory SQLite multiplexes every session onto
+# one shared connection (StaticPool), so the projection worker's
+# transaction would otherwise interleave with a command's event write
+# on the same connection and break both commits.
+_WRITE_LOCK = threading.Lock()
+
+
+def configure_sqlite_pragmas(engine):
+    """
+    Tunes each raw SQLite connection made by the given engine.
+
+    WAL journalling with relaxed synchronisation turns the two fsyncs
+    per committed event into roughly one sequential append. In-memory
+    databases silently fall back to their MEMORY journal.
+    """
+    @sqlalchemy_event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in SQLITE_PRAGMAS:
+            cursor.execute(pragma)
+        cursor.close()
 
 
-USER_LIST_COLLECTION_NS = UUID('af3e9b7b-22e0-4758-9b0b-c90949d4838e')
+def uuid7():
+    """
+    Returns a version 7 (time-ordered) UUID.
+
+    The leading 48 bits are milliseconds since the Unix epoch, so IDs
+    minted over time land near each other in B-tree indexes and new
+    aggregates append to the tail of the stored_events primary key,
+    instead of scattering inserts across random pages like uuid4.
+    """
+    value = bytearray((time.time_ns() // 1000000).to_bytes(6, 'big') + os.urandom(10))
+    value[6] = (value[6] & 0x0F) | 0x70  # Version 7.
+    value[8] = (value[8] & 0x3F) | 0x80  # RFC 4122 variant.
+    return UUID(bytes=bytes(value))
 
 
 class TodoList(AggregateRoot):
@@ -15,76 +94,61 @@ class TodoList(AggregateRoot):
     def __init__(self, user_id, **kwargs):
         super(TodoList, self).__init__(**kwargs)
         self.user_id = user_id
-        self.items = []
+        # Items are stored in a persistent vector, so mid-list updates
+        # and discards are O(log N) structural shares rather than O(N)
+        # shifts, and snapshots share structure with the live state
+        # instead of copying it.
+        self._items = pvector()
+
+    @property
+    def items(self):
+        """Items in insertion order."""
+        return self._items
 
     @classmethod
     def start(cls, user_id):
-        todo_list_id = uuid4()
+        todo_list_id = uuid7()
         return cls.__create__(originator_id=todo_list_id, user_id=user_id, event_class=cls.Started)
 
     class Event(AggregateRoot.Event):
-        """Layer base class."""
+        """
+        Layer base class.
+
+        Events keep the library's __dict__-based state: the integrity
+        hash and the stored representation are both computed over
+        __dict__, so the event classes cannot use __slots__.
+        """
 
     class Started(Event, AggregateRoot.Created):
         """Published when a new list is started."""
 
-        @property
-        def user_id(self):
-            return self.__dict__['user_id']
-
     class ItemAdded(Event):
         """Published when an item is added to a list."""
 
-        @property
-        def item(self):
-            return self.__dict__['item']
+        def mutate(self, entity):
+            entity._items = entity._items.append(self.item)
 
-        @property
-        def list_id(self):
-            return self.__dict__['list_id']
+    class ItemsAdded(Event):
+        """Published when many items are added to a list at once."""
 
         def mutate(self, entity):
-            entity.items.append(self.item)
+            entity._items = entity._items.extend(self.items)
 
     class ItemUpdated(Event):
         """Published when an item is updated in a list."""
 
-        @property
-        def index(self):
-            return self.__dict__['index']
-
-        @property
-        def item(self):
-            return self.__dict__['item']
-
-        @property
-        def list_id(self):
-            return self.__dict__['list_id']
-
         def mutate(self, entity):
-            entity.items[self.index] = self.item
+            entity._items = entity._items.set(self.index, self.item)
 
     class ItemDiscarded(Event):
         """Published when an item in a list is discarded."""
 
-        @property
-        def index(self):
-            return self.__dict__['index']
-
-        @property
-        def list_id(self):
-            return self.__dict__['list_id']
-
         def mutate(self, entity):
-            entity.items.pop(self.index)
+            entity._items = entity._items.delete(self.index)
 
     class Discarded(Event, AggregateRoot.Discarded):
         """Published when a list is discarded."""
 
-        @property
-        def user_id(self):
-            return self.__dict__['user_id']
-
     #
     # Commands.
     #
@@ -96,6 +160,18 @@ class TodoList(AggregateRoot):
             item=item,
         )
 
+    def add_items(self, items):
+        """
+        Adds many items with a single event.
+
+        A bulk load of N items is then one stored event and one event
+        application on replay, instead of N of each.
+        """
+        self.__trigger_event__(
+            TodoList.ItemsAdded,
+            items=tuple(items),
+        )
+
     def update_item(self, index, item):
         """Updates item."""
         self.__trigger_event__(
@@ -119,28 +195,425 @@ class TodoList(AggregateRoot):
         )
 
 
+def todo_list_mutator(initial, event):
+    """
+    Replays one event onto an entity, with a dispatch-table fast path.
+
+    Item events are looked up in a dict keyed on exact event type and
+    applied in this single frame, instead of walking the five-deep
+    __mutate__() super-call chain per event. The identity, version and
+    hash-chain checks from that chain are preserved. Anything not in
+    the table falls back to the generic event dispatch.
+    """
+    mutate = _TODO_LIST_ITEM_MUTATORS.get(type(event))
+    if mutate is None:
+        return event.__mutate__(initial)
+    event.__check_obj__(initial)
+    if event.__with_data_integrity__:
+        event.__check_hash__()
+    mutate(event, initial)
+    initial.__head__ = event.__event_hash__
+    initial.___version__ = event.originator_version
+    initial.___last_modified__ = event.timestamp
+    return initial
+
+
+_TODO_LIST_ITEM_MUTATORS = {
+    TodoList.ItemAdded: TodoList.ItemAdded.mutate,
+    TodoList.ItemsAdded: TodoList.ItemsAdded.mutate,
+    TodoList.ItemUpdated: TodoList.ItemUpdated.mutate,
+    TodoList.ItemDiscarded: TodoList.ItemDiscarded.mutate,
+}
+
+# Replay expressions for the item events, inlined into the generated
+# replay loop below. 'state' is the event's __dict__.
+_REPLAY_ITEM_OPS = (
+    ('ItemAdded', "initial._items.append(state['item'])"),
+    ('ItemsAdded', "initial._items.extend(state['items'])"),
+    ('ItemUpdated', "initial._items.set(state['index'], state['item'])"),
+    ('ItemDiscarded', "initial._items.delete(state['index'])"),
+)
+
+
+def _compile_replay_function():
+    """
+    Generates a straight-line replay loop specialized for TodoList.
+
+    Replaying a stream through reduce() costs one todo_list_mutator
+    frame plus a dispatch lookup per event. The event set is fixed and
+    small, so generate one function that walks the stream in a single
+    frame, testing event types against inlined branches and keeping
+    the same identity, version and hash-chain checks. Anything not in
+    the table (Started, Discarded, snapshots) falls back to the
+    generic mutator.
+    """
+    lines = [
+        'def _replay_todo_list_events(initial, events):',
+        '    for event in events:',
+        '        event_type = type(event)',
+    ]
+    keyword = 'if'
+    for name, expression in _REPLAY_ITEM_OPS:
+        lines.extend([
+            '        {} event_type is {}:'.format(keyword, name),
+            '            event.__check_obj__(initial)',
+            '            if event.__with_data_integrity__:',
+            '                event.__check_hash__()',
+            '            state = event.__dict__',
+            '            initial._items = {}'.format(expression),
+        ])
+        keyword = 'elif'
+    lines.extend([
+        '        else:',
+        '            initial = todo_list_mutator(initial, event)',
+        '            continue',
+        "        initial.__head__ = state['__event_hash__']",
+        "        initial.___version__ = state['originator_version']",
+        "        initial.___last_modified__ = state['timestamp']",
+        '    return initial',
+    ])
+    namespace = {name: getattr(TodoList, name) for name, _ in _REPLAY_ITEM_OPS}
+    namespace['todo_list_mutator'] = todo_list_mutator
+    exec(compile('\n'.join(lines), '<todo-list-replay>', 'exec'), namespace)
+    return namespace['_replay_todo_list_events']
+
+
+_replay_todo_list_events = _compile_replay_function()
+
+
+#
+# Infrastructure.
+#
+
+class BatchingRecordManager(SQLAlchemyRecordManager):
+    """
+    Record manager that writes runs of records sharing one insert
+    statement with a single executemany call, instead of one execute
+    round-trip per record. A multi-event save (e.g. TodoApp.batch())
+    then costs one prepared statement executed with an array of
+    parameters, inside the same transaction as before.
+
+    Reads of a whole stream (or its tail above a snapshot) go through
+    a statement compiled once and reused with bound parameters, so
+    hydration skips per-call ORM query construction.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(BatchingRecordManager, self).__init__(*args, **kwargs)
+        self._select_stream_compiled = None
+
+    @property
+    def _select_stream(self):
+        """Compiled SELECT for the ascending whole-or-tail stream read."""
+        if self._select_stream_compiled is None:
+            table = self.record_class.__table__
+            sequence_id_col = getattr(table.c, self.field_names.sequence_id)
+            position_col = getattr(table.c, self.field_names.position)
+            statement = select([table]).where(
+                sequence_id_col == bindparam('sequence_id', type_=sequence_id_col.type),
+            ).where(
+                position_col >= bindparam('gte', type_=position_col.type),
+            ).order_by(asc(position_col))
+            if hasattr(self.record_class, 'application_id'):
+                application_id_col = table.c.application_id
+                statement = statement.where(
+                    application_id_col == bindparam('application_id', type_=application_id_col.type),
+                )
+            self._select_stream_compiled = statement.compile(dialect=self.session.bind.dialect)
+        return self._select_stream_compiled
+
+    def get_records(self, sequence_id, gt=None, gte=None, lt=None, lte=None, limit=None,
+                    query_ascending=True, results_ascending=True):
+        # Anything other than an ascending read of the stream (or of its
+        # tail, when hydrating above a snapshot) takes the generic path.
+        if gt is not None or lt is not None or lte is not None or limit is not None \
+                or not query_ascending or not results_ascending:
+            return super(BatchingRecordManager, self).get_records(
+                sequence_id, gt=gt, gte=gte, lt=lt, lte=lte, limit=limit,
+                query_ascending=query_ascending, results_ascending=results_ascending,
+            )
+        params = {'sequence_id': sequence_id, 'gte': gte if gte is not None else 0}
+        if hasattr(self.record_class, 'application_id'):
+            params['application_id'] = self.application_id
+        try:
+            return self.session.bind.execute(self._select_stream, **params).fetchall()
+        finally:
+            self.session.close()
+
+    def _write_records(self, records, tracking_kwargs=None):
+        try:
+            with _WRITE_LOCK, self.session.bind.begin() as connection:
+                if tracking_kwargs:
+                    params = {c: tracking_kwargs[c] for c in self.tracking_record_field_names}
+                    connection.execute(self.insert_tracking_record, **params)
+
+                # Group consecutive records by statement, preserving order.
+                batches = []
+                for record in records:
+
+                    params = {c: getattr(record, c) for c in self.field_names}
+                    if hasattr(self.record_class, 'application_id'):
+                        params['application_id'] = self.application_id
+                    if hasattr(self.record_class, 'pipeline_id'):
+                        params['pipeline_id'] = self.pipeline_id
+                    if hasattr(record, 'causal_dependencies'):
+                        params['causal_dependencies'] = record.causal_dependencies
+
+                    statement = self.insert_values
+
+                    if hasattr(self.record_class, 'id'):
+                        if record.id is None and self.contiguous_record_ids:
+                            statement = self.insert_select_max
+                        else:
+                            if hasattr(self.record_class, 'application_id'):
+                                assert record.id, "record ID not set when required"
+                            params['id'] = record.id
+
+                    if batches and batches[-1][0] is statement:
+                        batches[-1][1].append(params)
+                    else:
+                        batches.append((statement, [params]))
+
+                for statement, params_list in batches:
+                    connection.execute(statement, params_list)
+
+        except IntegrityError as e:
+            self.raise_record_integrity_error(e)
+
+        except OperationalError as e:
+            self.raise_operational_error(e)
+
+
+class BatchingInfrastructureFactory(SQLAlchemyInfrastructureFactory):
+    record_manager_class = BatchingRecordManager
+
+
+class TodoJSONEncoder(ObjectJSONEncoder):
+    """Extends the library's transcoder with persistent vectors."""
+
+    def default(self, obj):
+        if isinstance(obj, PVector):
+            return {'__pvector__': list(obj)}
+        return super(TodoJSONEncoder, self).default(obj)
+
+
+class TodoJSONDecoder(ObjectJSONDecoder):
+    """Extends the library's transcoder with persistent vectors."""
+
+    @classmethod
+    def from_jsonable(cls, d):
+        if '__pvector__' in d:
+            return pvector(d['__pvector__'])
+        return ObjectJSONDecoder.from_jsonable(d)
+
+
+_OBJECT_JSON_ENCODER = TodoJSONEncoder()
+
+
+def _to_jsonable(obj):
+    """Converts rich values to the library's JSON marker format."""
+    if isinstance(obj, dict):
+        return {key: _to_jsonable(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_to_jsonable(value) for value in obj]
+    if isinstance(obj, (str, int, float, bool)) or obj is None:
+        return obj
+    return _to_jsonable(_OBJECT_JSON_ENCODER.default(obj))
+
+
+def _from_jsonable(obj):
+    """Restores rich values from the library's JSON marker format."""
+    if isinstance(obj, dict):
+        return TodoJSONDecoder.from_jsonable(
+            {key: _from_jsonable(value) for key, value in obj.items()}
+        )
+    if isinstance(obj, list):
+        return [_from_jsonable(value) for value in obj]
+    return obj
+
+
+class OrjsonSequencedItemMapper(SequencedItemMapper):
+    """
+    Sequenced item mapper that parses and serialises event state with
+    orjson's C codec, using the same on-disk JSON marker format as the
+    library's transcoder, so rows written either way stay readable.
+    Falls back to the stdlib codec if orjson isn't installed.
+    """
+
+    def construct_item_args(self, domain_event):
+        event_attrs = domain_event.__dict__.copy()
+        sequence_id = event_attrs.get(self.sequence_id_attr_name)
+        position = event_attrs.get(self.position_attr_name)
+        topic = get_topic(domain_event.__class__)
+
+        if orjson is not None:
+            data = orjson.dumps(_to_jsonable(event_attrs), option=orjson.OPT_SORT_KEYS).decode('utf-8')
+        else:
+            data = json_dumps(event_attrs, cls=self.json_encoder_class)
+
+        if self.cipher:
+            data = self.cipher.encrypt(data)
+
+        other_args = tuple((getattr(domain_event, name) for name in self.other_attr_names))
+
+        return (sequence_id, position, topic, data) + other_args
+
+    def from_topic_and_data(self, topic, data):
+        if self.cipher:
+            data = self.cipher.decrypt(data)
+
+        if orjson is not None:
+            event_attrs = _from_jsonable(orjson.loads(data))
+        else:
+            event_attrs = json_loads(data, cls=self.json_decoder_class)
+
+        domain_event_class = resolve_topic(topic)
+        return reconstruct_object(domain_event_class, event_attrs)
+
+
+#
+# Repositories.
+#
+
+class TodoListRepository(EventSourcedRepository):
+    """Repository that replays streams through the generated loop."""
+
+    def replay_events(self, initial_state, domain_events):
+        return _replay_todo_list_events(initial_state, domain_events)
+
+
+class CachingRepository(object):
+    """
+    Identity map around an event-sourced repository.
+
+    Keeps hydrated to-do list aggregates in a bounded LRU mapping
+    keyed by list ID, so repeat access costs a dict lookup instead of
+    replaying the whole event stream. Entries are evicted when a list
+    is discarded, or least-recently-used first once the cache is full.
+    """
+    def __init__(self, repository, maxsize=1024):
+        self.repository = repository
+        self.maxsize = maxsize
+        self.cache = OrderedDict()
+        subscribe(self.evict_discarded, self.is_todo_list_event)
+
+    def close(self):
+        unsubscribe(self.evict_discarded, self.is_todo_list_event)
+
+    def is_todo_list_event(self, event):
+        if isinstance(event, (list, tuple)):
+            event_class = TodoList.Event
+            return all(isinstance(e, event_class) for e in event)
+        return isinstance(event, TodoList.Event)
+
+    def evict_discarded(self, event):
+        if isinstance(event, (list, tuple)):
+            for e in event:
+                self.evict_discarded(e)
+            return
+        if isinstance(event, TodoList.Discarded):
+            self.cache.pop(event.originator_id, None)
+
+    def __getitem__(self, todo_list_id):
+        try:
+            todo_list = self.cache[todo_list_id]
+        except KeyError:
+            todo_list = self.repository[todo_list_id]
+            self.cache[todo_list_id] = todo_list
+            if len(self.cache) > self.maxsize:
+                self.cache.popitem(last=False)
+        else:
+            self.cache.move_to_end(todo_list_id)
+        return todo_list
+
+
 #
 # Event-sourced aggregates.
 #
 
-class TodoApp(SimpleApplication):
+class TodoApp(SnapshottingApplication):
 
-    persist_event_type = (TodoList.Event, Collection.Event)
+    persist_event_type = TodoList.Event
 
     def __init__(self, *args, **kwargs):
+        kwargs.setdefault('period', SNAPSHOT_PERIOD)
         super().__init__(*args, **kwargs)
-        self.user_list_projection_policy = UserListProjectionPolicy(self.repository)
+        self.todo_lists = CachingRepository(self.repository)
+        self.user_list_projection_policy = UserListProjectionPolicy(self.session)
+
+    def setup_event_store(self):
+        super(TodoApp, self).setup_event_store()
+        # Rebuild the snapshot store's mapper with the orjson codec and
+        # the transcoder that knows about persistent vectors, since
+        # snapshot state carries the aggregate's items vector as-is.
+        self.snapshot_store = EventStore(
+            record_manager=self.snapshot_store.record_manager,
+            sequenced_item_mapper=OrjsonSequencedItemMapper(
+                sequence_id_attr_name='originator_id',
+                position_attr_name='originator_version',
+                json_encoder_class=TodoJSONEncoder,
+                json_decoder_class=TodoJSONDecoder,
+            ),
+        )
+
+    def construct_event_store(self, application_id, pipeline_id):
+        sequenced_item_class = self.sequenced_item_class or StoredEvent
+        sequenced_item_mapper = OrjsonSequencedItemMapper(
+            sequenced_item_class=sequenced_item_class,
+            cipher=self.cipher,
+        )
+        factory = BatchingInfrastructureFactory(
+            session=self.datastore.session,
+            integer_sequenced_record_class=self.stored_event_record_class or StoredEventRecord,
+            sequenced_item_class=sequenced_item_class,
+            contiguous_record_ids=self.contiguous_record_ids,
+            application_id=application_id,
+            pipeline_id=pipeline_id,
+        )
+        return EventStore(
+            record_manager=factory.construct_integer_sequenced_record_manager(),
+            sequenced_item_mapper=sequenced_item_mapper,
+        )
+
+    def construct_repository(self, event_store, **kwargs):
+        return TodoListRepository(
+            event_store=event_store, mutator_func=todo_list_mutator, **kwargs
+        )
+
+    def setup_datastore(self, session, uri, pool_size=5):
+        super(TodoApp, self).setup_datastore(session, uri, pool_size)
+        # When the app owns the connection, tune SQLite before it is first used.
+        # Externally managed sessions can be tuned with configure_sqlite_pragmas().
+        if session is None and self.datastore.is_sqlite():
+            if ':memory:' in self.datastore.settings.uri:
+                # Share one connection between threads, otherwise each
+                # thread (e.g. the projection worker) gets its own empty
+                # in-memory database.
+                self.datastore._engine = create_engine(
+                    self.datastore.settings.uri,
+                    poolclass=StaticPool,
+                    connect_args={'check_same_thread': False},
+                )
+            else:
+                self.datastore.setup_connection()
+            configure_sqlite_pragmas(self.datastore._engine)
+
+    def setup_table(self):
+        super(TodoApp, self).setup_table()
+        # Also setup the read model tables.
+        self.datastore.setup_table(UserListRecord)
+        self.datastore.setup_table(TodoListStateRecord)
 
     def get_todo_list_ids(self, user_id):
         """Returns list of IDs of to-do lists for a user."""
-        collection_id = make_user_list_collection_id(user_id)
+        # The projection runs asynchronously; wait for it to catch up
+        # so this query reads its own writes.
+        self.user_list_projection_policy.flush()
         try:
-            collection = self.repository[collection_id]
-        except KeyError:
-            return []
-        else:
-            assert isinstance(collection, Collection)
-            return collection.items
+            query = self.session.query(UserListRecord.todo_list_id).filter_by(user_id=user_id)
+            return ItemsView({todo_list_id for (todo_list_id,) in query})
+        finally:
+            self.session.close()
 
     @staticmethod
     def start_todo_list(user_id):
@@ -149,98 +622,295 @@ class TodoApp(SimpleApplication):
         todo_list.__save__()
         return todo_list.id
 
+    @contextmanager
+    def batch(self, todo_list_id):
+        """
+        Yields a to-do list whose commands are persisted as one batch.
+
+        Events triggered inside the block stay pending on the aggregate
+        and are stored under a single transaction on exit, giving one
+        commit (and one journal sync) per batch instead of per command.
+        """
+        todo_list = self.todo_lists[todo_list_id]
+        yield todo_list
+        todo_list.__save__()
+
+    def add_todo_items(self, todo_list_id, items):
+        """Adds many to-do items to a list with a single event."""
+        todo_list = self.todo_lists[todo_list_id]
+        todo_list.add_items(items)
+        todo_list.__save__()
+
+    def bulk_add_items(self, todo_list_id, items):
+        """
+        Adds many to-do items and refreshes the list's state mirror.
+
+        One ItemsAdded event is stored, then the whole list is written
+        to the todo_list_states row in a single upsert.
+        """
+        with self.batch(todo_list_id) as todo_list:
+            todo_list.add_items(items)
+        self.write_list_state(todo_list)
+
+    def write_list_state(self, todo_list):
+        """Upserts the list's row in the state mirror table."""
+        with _WRITE_LOCK:
+            try:
+                self.session.merge(TodoListStateRecord(
+                    todo_list_id=todo_list.id,
+                    items=json_dumps(list(todo_list.items)),
+                    version=todo_list.__version__,
+                ))
+                self.session.commit()
+            except Exception:
+                self.session.rollback()
+                raise
+            finally:
+                self.session.close()
+
+    def get_todo_list_state(self, todo_list_id):
+        """Returns (items, version) from the list's state mirror row."""
+        try:
+            record = self.session.query(TodoListStateRecord).get(todo_list_id)
+            if record is None:
+                raise KeyError(todo_list_id)
+            return tuple(json_loads(record.items)), record.version
+        finally:
+            self.session.close()
+
+    def discard_todo_items(self, todo_list_id, indices):
+        """
+        Discards many to-do items from a list in one batch.
+
+        Indices refer to the list as it stood before this call.
+        """
+        with self.batch(todo_list_id) as todo_list:
+            for index in sorted(indices, reverse=True):
+                todo_list.discard_item(index)
+
     def add_todo_item(self, todo_list_id, item):
         """Added to-do item to a to-do list."""
-        todo_list = self.repository[todo_list_id]
-        assert isinstance(todo_list, TodoList)
+        todo_list = self.todo_lists[todo_list_id]
         todo_list.add_item(item=item)
         todo_list.__save__()
 
     def get_todo_items(self, todo_list_id):
         """Returns a tuple of to-do items."""
-        todo_list = self.repository[todo_list_id]
+        todo_list = self.todo_lists[todo_list_id]
         return tuple(todo_list.items)
 
     def update_todo_item(self, todo_list_id, index, item):
         """Updates a to-do item in a list."""
-        todo_list = self.repository[todo_list_id]
+        todo_list = self.todo_lists[todo_list_id]
         todo_list.update_item(index, item)
         todo_list.__save__()
 
     def discard_todo_item(self, todo_list_id, index):
         """Discards a to-do item in a list."""
-        todo_list = self.repository[todo_list_id]
+        todo_list = self.todo_lists[todo_list_id]
         todo_list.discard_item(index)
         todo_list.__save__()
 
     def discard_todo_list(self, todo_list_id):
         """Discards a to-do list."""
-        todo_list = self.repository[todo_list_id]
+        todo_list = self.todo_lists[todo_list_id]
         todo_list.__discard__()
         todo_list.__save__()
 
     def close(self):
-        super(TodoApp, self).close()
+        # Stop the projection worker before the stores it writes to.
         self.user_list_projection_policy.close()
+        self.todo_lists.close()
+        super(TodoApp, self).close()
 
 
 #
 # Projections.
 #
 
-class UserListProjectionPolicy(object):
+class UserListRecord(Base):
     """
-    Updates a user list collection whenever a list is created or discarded.
+    Materialized view row relating a user to one of their to-do lists.
+
+    The event store remains the source of truth; this table is just a
+    query index maintained by the projection policy, so reading a
+    user's list IDs is one indexed SELECT rather than a replay of the
+    user's whole collection history.
     """
-    def __init__(self, repository):
-        self.repository = repository
-        subscribe(self.add_list_to_collection, self.is_list_started)
-        subscribe(self.remove_list_from_collection, self.is_list_discarded)
+    __tablename__ = 'user_lists'
 
-    def close(self):
-        unsubscribe(self.add_list_to_collection, self.is_list_started)
-        unsubscribe(self.remove_list_from_collection, self.is_list_discarded)
+    user_id = Column(UUIDType(), primary_key=True)
 
-    def is_list_started(self, event):
-        if isinstance(event, (list, tuple)):
-            return all(map(self.is_list_started, event))
-        return isinstance(event, TodoList.Started)
+    todo_list_id = Column(UUIDType(), primary_key=True)
 
-    def is_list_discarded(self, event):
-        if isinstance(event, (list, tuple)):
-            return all(map(self.is_list_discarded, event))
-        return isinstance(event, TodoList.Discarded)
-
-    def add_list_to_collection(self, event):
-        assert isinstance(event, list)
-        event = event[0]
-        assert isinstance(event, TodoList.Started)
-        user_id = event.user_id
-        collection_id = make_user_list_collection_id(user_id)
-        try:
-            collection = self.repository[collection_id]
-        except KeyError:
-            collection = register_new_collection(collection_id=collection_id)
 
-        assert isinstance(collection, Collection)
-        collection.add_item(event.originator_id)
+class TodoListStateRecord(Base):
+    """
+    Mirror row holding a list's current items as one JSON document.
 
-    def remove_list_from_collection(self, event):
-        if isinstance(event, (list, tuple)):
-            for e in event:
-                self.remove_list_from_collection(e)
-            return
+    Bulk writes update this row in place, one UPDATE per batch instead
+    of one INSERT per item, so external readers can fetch a list's
+    state without replaying its events. The event store remains the
+    source of truth and this row can always be rebuilt from it.
+    """
+    __tablename__ = 'todo_list_states'
+
+    todo_list_id = Column(UUIDType(), primary_key=True)
+
+    items = Column(Text(), nullable=False)
+
+    version = Column(BigInteger().with_variant(Integer, 'sqlite'), nullable=False)
+
+
+class ItemsView(object):
+    """
+    Lazy, set-like view over a collection of items.
+
+    Iteration, len() and membership go straight to the underlying
+    set without materializing a copy. Equality compares membership,
+    so callers can still compare against sets and lists.
+    """
+    def __init__(self, items):
+        self._items = items
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, item):
+        return item in self._items
+
+    def __eq__(self, other):
+        if isinstance(other, ItemsView):
+            other = other._items
+        return set(self._items) == set(other)
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __repr__(self):
+        return '{}({!r})'.format(type(self).__name__, self._items)
 
-        assert isinstance(event, TodoList.Discarded), event
-        user_id = event.user_id
-        collection_id = make_user_list_collection_id(user_id)
-        try:
-            collection = self.repository[collection_id]
-        except KeyError:
-            pass
-        else:
-            collection.remove_item(event.originator_id)
 
+class UserListProjectionPolicy(object):
+    """
+    Maintains the user_lists table whenever a list is started or discarded.
+
+    Events are queued and applied by a background worker thread, so the
+    command path returns as soon as the aggregate events are persisted.
+    The worker drains whatever has accumulated on the queue and commits
+    it as one bulk write (up to flush_size rows), so single commands
+    still land immediately while replay or catch-up traffic collapses
+    into a few hundred rows per commit. Queries that need
+    read-your-writes consistency call flush() first.
+    """
+    def __init__(self, session, flush_size=500):
+        self.session = session
+        self.flush_size = flush_size
+        self.pending_inserts = []
+        self.pending_deletes = []
+        # Route events to handlers on exact type, so deciding whether a
+        # published event (or batch) is interesting is a dict lookup
+        # rather than a pair of recursive isinstance predicates.
+        self.routes = {
+            TodoList.Started: self.buffer_insert,
+            TodoList.Discarded: self.buffer_delete,
+        }
+        self.queue = queue.Queue()
+        self.worker = threading.Thread(
+            target=self.drain_queue, name='user-list-projection', daemon=True,
+        )
+        self.worker.start()
+        subscribe(self.enqueue_events, self.is_routed_event)
+
+    def close(self):
+        unsubscribe(self.enqueue_events, self.is_routed_event)
+        self.flush()
+        self.queue.put(None)
+        self.worker.join()
 
-def make_user_list_collection_id(user_id, collection_ns=USER_LIST_COLLECTION_NS):
-    return uuid5(collection_ns, str(user_id))
+    def is_routed_event(self, event):
+        routes = self.routes
+        if isinstance(event, (list, tuple)):
+            return any(type(e) in routes for e in event)
+        return type(event) in routes
+
+    def enqueue_events(self, event):
+        self.queue.put(event)
+
+    def drain_queue(self):
+        while True:
+            # Take one entry, then greedily whatever else is queued, so
+            # a backlog is written in bulk rather than row by row.
+            batch = [self.queue.get()]
+            while len(batch) < self.flush_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                for events in batch:
+                    if events is None:
+                        continue
+                    if not isinstance(events, (list, tuple)):
+                        events = (events,)
+                    for event in events:
+                        handler = self.routes.get(type(event))
+                        if handler is not None:
+                            handler(event)
+                self.write_pending()
+            except Exception:
+                logging.getLogger(__name__).exception('user list projection failed')
+            finally:
+                # Entries count as done only once their rows are
+                # committed, so flush() gives read-your-writes.
+                for _ in batch:
+                    self.queue.task_done()
+            if batch[-1] is None:
+                return
+
+    def flush(self):
+        """Blocks until all queued projection updates have been applied."""
+        self.queue.join()
+
+    def buffer_insert(self, event):
+        assert isinstance(event, TodoList.Started), event
+        self.pending_inserts.append({
+            'user_id': event.user_id,
+            'todo_list_id': event.originator_id,
+        })
+
+    def buffer_delete(self, event):
+        assert isinstance(event, TodoList.Discarded), event
+        self.pending_deletes.append((event.user_id, event.originator_id))
+
+    def write_pending(self):
+        """Commits the buffered row changes in one transaction."""
+        if not self.pending_inserts and not self.pending_deletes:
+            return
+        inserts, self.pending_inserts = self.pending_inserts, []
+        deletes, self.pending_deletes = self.pending_deletes, []
+        with _WRITE_LOCK:
+            try:
+                if inserts:
+                    # OR IGNORE keeps replaying a Started event over an
+                    # existing row a no-op instead of a key violation.
+                    self.session.execute(
+                        UserListRecord.__table__.insert().prefix_with('OR IGNORE'),
+                        inserts,
+                    )
+                if deletes:
+                    self.session.query(UserListRecord).filter(
+                        tuple_(
+                            UserListRecord.user_id,
+                            UserListRecord.todo_list_id,
+                        ).in_(deletes)
+                    ).delete(synchronize_session=False)
+                self.session.commit()
+            except Exception:
+                self.session.rollback()
+                raise
+            finally:
+                self.session.close()
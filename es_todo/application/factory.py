@@ -0,0 +1,62 @@
+import os
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.pool import QueuePool, StaticPool
+
+from eventsourcing.infrastructure.sqlalchemy.records import SnapshotRecord, StoredEventRecord
+
+from es_todo.application.base import (
+    TodoApp,
+    TodoListStateRecord,
+    UserListRecord,
+    configure_sqlite_pragmas,
+)
+
+# Default database for apps constructed without an explicit session.
+DEFAULT_DB_URI = os.getenv('DB_URI', 'sqlite:///:memory:')
+
+
+def construct_engine(uri=DEFAULT_DB_URI):
+    """
+    Constructs a tuned engine for the given database URI.
+
+    In-memory SQLite shares one connection between threads (each pooled
+    connection would otherwise be its own empty database); anything else
+    gets a connection pool, so checking out a session reuses an open
+    connection instead of paying the connect cost per app instance.
+    """
+    if ':memory:' in uri:
+        engine = create_engine(
+            uri,
+            poolclass=StaticPool,
+            connect_args={'check_same_thread': False},
+        )
+    else:
+        engine = create_engine(
+            uri,
+            poolclass=QueuePool,
+            pool_size=8,
+            pool_pre_ping=True,
+        )
+    if uri.startswith('sqlite'):
+        configure_sqlite_pragmas(engine)
+    return engine
+
+
+# Shared at module level, so every app constructed by this factory reuses
+# the same engine, pooled connections and session registry.
+engine = construct_engine()
+
+Session = scoped_session(sessionmaker(bind=engine))
+
+# The application skips table setup when given an external session, so
+# create the tables here, once, against the shared engine.
+for record_class in (StoredEventRecord, SnapshotRecord, UserListRecord, TodoListStateRecord):
+    record_class.__table__.create(engine, checkfirst=True)
+
+
+def construct_todo_app(**kwargs):
+    """Constructs a TodoApp on the shared session registry."""
+    kwargs.setdefault('session', Session)
+    return TodoApp(**kwargs)
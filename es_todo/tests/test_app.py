@@ -1,6 +1,8 @@
 # -8- coding: utf-8 -*-
 from uuid import uuid4
 
+import pytest
+
 from eventsourcing.infrastructure.sqlalchemy.datastore import SQLAlchemyDatastore, SQLAlchemySettings
 
 from es_todo.application.base import TodoApp
@@ -75,10 +77,16 @@ also be possible to have an event sourced collection of todo lists for each user
 """
 
 
-def test():
-    # Construct application.
+@pytest.fixture(scope='module')
+def app():
+    # One application (and one datastore with its tables) serves the
+    # whole module; each test isolates itself with a fresh user ID.
     app = TodoApp()
+    yield app
+    app.close()
+
 
+def test(app):
     # Check the user initially has no lists.
     user_id = uuid4()
     todo_list_ids = app.get_todo_list_ids(user_id)
@@ -114,3 +122,17 @@ def test():
     app.discard_todo_list(todo_list_id=todo_list_id)
     todo_list_ids = app.get_todo_list_ids(user_id)
     assert len(todo_list_ids) == 0
+
+
+def test_batch(app):
+    # Start a new list.
+    user_id = uuid4()
+    todo_list_id = app.start_todo_list(user_id)
+
+    # Add several items in one batch.
+    app.add_todo_items(todo_list_id=todo_list_id, items=['item1', 'item2', 'item3'])
+    assert app.get_todo_items(todo_list_id) == ('item1', 'item2', 'item3')
+
+    # Discard the first and last items in one batch.
+    app.discard_todo_items(todo_list_id=todo_list_id, indices=[0, 2])
+    assert app.get_todo_items(todo_list_id) == ('item2',)